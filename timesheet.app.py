@@ -1,108 +1,459 @@
+import csv
+import functools
+import hashlib
+import hmac
+import io
 import streamlit as st
 import sqlite3
+import threading
 import pandas as pd
 import os
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import date, datetime
 
 # ------------------------------------------------------------------------------
 # DATABASE OPERATIONS
 # ------------------------------------------------------------------------------
 
-# Create a connection to the SQLite database
-# `check_same_thread=False` allows usage from within Streamlit
-conn = sqlite3.connect("timesheet.db", check_same_thread=False)
+DB_PATH = "timesheet.db"
+
+def _apply_pragmas(db):
+    """
+    Tune a connection once at open: WAL avoids the fsync-heavy rollback
+    journal on every commit and lets readers proceed while a write is in
+    flight, which matters under Streamlit's one-thread-per-session model.
+    """
+    cur = db.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-20000")
+    cur.execute("PRAGMA mmap_size=268435456")
+    cur.close()
+
+# Dedicated writer connection, shared across sessions and serialized by
+# _write_lock so concurrent "Log Hours" clicks queue in Python instead of
+# fighting over SQLite's mutex. `cached_statements=256` keeps every query
+# below compiled between calls, and `isolation_level=None` puts transaction
+# control in our hands (each writer issues explicit BEGIN IMMEDIATE/COMMIT).
+conn = sqlite3.connect(
+    DB_PATH,
+    check_same_thread=False,
+    cached_statements=256,
+    isolation_level=None,
+)
 c = conn.cursor()
+_apply_pragmas(conn)
+_write_lock = threading.Lock()
 
-def create_table():
+# Pre-bound writer methods: the hot write helpers call these instead of
+# re-doing the c.execute attribute lookup on every invocation.
+_execute = c.execute
+_executemany = c.executemany
+
+@contextmanager
+def _write_tx():
     """
-    Create the timesheet table if it doesn't already exist.
+    One write transaction on the shared writer: takes the lock, grabs
+    SQLite's write lock up front with BEGIN IMMEDIATE (so concurrent
+    sessions queue here instead of failing mid-transaction with
+    'database is locked'), and commits once; any error rolls back.
     """
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS timesheet (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            work_date TEXT UNIQUE,
-            hours_worked REAL,
-            month_name TEXT
+    with _write_lock:
+        _execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except Exception:
+            _execute("ROLLBACK")
+            raise
+        _execute("COMMIT")
+
+# Reads get one connection per script-run thread, so concurrent viewers
+# never serialize on a shared handle.
+_local = threading.local()
+
+def get_conn():
+    """
+    Return this thread's read connection, opening it on first use.
+    """
+    if not hasattr(_local, "conn"):
+        _local.conn = sqlite3.connect(
+            DB_PATH,
+            cached_statements=256,
+            isolation_level=None,
         )
-    """)
-    conn.commit()
+        _apply_pragmas(_local.conn)
+    return _local.conn
 
-def add_data(work_date, hours_worked, month_name):
+def get_scalar_cursor():
     """
-    Insert or update a record into the timesheet table.
-    If an entry exists for the same date, REPLACE it.
+    This thread's single-column cursor: its row_factory unwraps each row
+    to its first value, so flat-list queries come back from SQLite
+    already flat instead of as 1-tuples needing a comprehension pass.
     """
-    c.execute(
-        """
-        INSERT OR REPLACE INTO timesheet (id, work_date, hours_worked, month_name)
-        VALUES (
-            (SELECT id FROM timesheet WHERE work_date = ?),
-            ?,
-            ?,
-            ?
-        )
-        """,
-        (work_date, work_date, hours_worked, month_name)
+    if not hasattr(_local, "scalar_cur"):
+        cur = get_conn().cursor()
+        cur.row_factory = lambda _cursor, row: row[0]
+        _local.scalar_cur = cur
+    return _local.scalar_cur
+
+# SQL lives in module-level constants so sqlite3's statement cache always
+# sees the same string objects and never recompiles a query.
+
+# work_date is stored as a YYYYMMDD integer: 8 bytes of text become a
+# small varint, ORDER BY follows B-tree order directly, and comparisons
+# are integer compares. month_name is derived from it inside SQLite
+# (strftime has no %B, hence the CASE), so writers can't leave the two
+# columns out of sync.
+SQL_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS timesheet (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        work_date INTEGER UNIQUE,
+        hours_worked REAL,
+        month_name TEXT GENERATED ALWAYS AS (
+            CASE (work_date / 100) % 100
+                WHEN 1 THEN 'January'
+                WHEN 2 THEN 'February'
+                WHEN 3 THEN 'March'
+                WHEN 4 THEN 'April'
+                WHEN 5 THEN 'May'
+                WHEN 6 THEN 'June'
+                WHEN 7 THEN 'July'
+                WHEN 8 THEN 'August'
+                WHEN 9 THEN 'September'
+                WHEN 10 THEN 'October'
+                WHEN 11 THEN 'November'
+                WHEN 12 THEN 'December'
+            END
+        ) VIRTUAL
     )
-    conn.commit()
+"""
 
-def get_months():
+def _to_db_date(date_str):
+    """
+    '2025-01-14' -> 20250114. DAO boundaries speak ISO strings; only the
+    storage format is integer.
     """
-    Retrieve the distinct months from the timesheet table, sorted.
+    return int(date_str.replace("-", ""))
+
+def _from_db_date(n):
     """
-    c.execute("SELECT DISTINCT month_name FROM timesheet ORDER BY month_name")
-    results = c.fetchall()
-    return [row[0] for row in results]
+    20250114 -> '2025-01-14'.
+    """
+    return f"{n // 10000:04d}-{n // 100 % 100:02d}-{n % 100:02d}"
+
+@functools.lru_cache(maxsize=None)
+def month_name_of(year, month):
+    """
+    Locale month name for (year, month). strftime('%B') goes through the
+    locale machinery on every call, but there are only twelve answers —
+    cache them instead of re-deriving one per rerun.
+    """
+    return date(year, month, 1).strftime("%B")
+
+# Native UPSERT: no correlated sub-SELECT per insert, and unlike
+# INSERT OR REPLACE it updates the conflicting row in place instead of
+# deleting and re-inserting it, so existing ids survive.
+SQL_UPSERT = """
+    INSERT INTO timesheet (work_date, hours_worked)
+    VALUES (?, ?)
+    ON CONFLICT(work_date) DO UPDATE SET hours_worked = excluded.hours_worked
+"""
+
+SQL_MONTH_SUMMARY = """
+    SELECT month_name, SUM(hours_worked), COUNT(*)
+    FROM timesheet GROUP BY month_name ORDER BY MIN(work_date)
+"""
 
+SQL_BY_MONTH = """
+    SELECT work_date AS "Date", hours_worked AS "Hours Worked", month_name AS "Month"
+    FROM timesheet WHERE month_name = ? ORDER BY work_date
+"""
+
+SQL_ALL_DATES = "SELECT DISTINCT work_date FROM timesheet ORDER BY work_date"
+
+SQL_HOURS_FOR_DATE = "SELECT hours_worked FROM timesheet WHERE work_date = ?"
+
+SQL_UPDATE_HOURS = "UPDATE timesheet SET hours_worked = ? WHERE work_date = ?"
+
+def create_table():
+    """
+    Create the timesheet table if it doesn't already exist, migrating
+    older databases that stored month_name as a plain column.
+    """
+    with _write_tx():
+        _create_table_locked()
+
+def _create_table_locked():
+    row = c.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='timesheet'"
+    ).fetchone()
+    if row and ("GENERATED" not in row[0] or "work_date INTEGER" not in row[0]):
+        # One-time rebuild: copy rows into the current schema, converting
+        # ISO-text dates to YYYYMMDD integers and letting the newest entry
+        # win if legacy data duplicated a date.
+        c.execute("ALTER TABLE timesheet RENAME TO timesheet_old")
+        c.execute(SQL_CREATE_TABLE)
+        c.execute("""
+            INSERT OR REPLACE INTO timesheet (id, work_date, hours_worked)
+            SELECT id, CAST(replace(work_date, '-', '') AS INTEGER), hours_worked
+            FROM timesheet_old ORDER BY id
+        """)
+        c.execute("DROP TABLE timesheet_old")
+    else:
+        c.execute(SQL_CREATE_TABLE)
+    # Covering index for the month filter + ORDER BY work_date, so
+    # get_timesheet_by_month avoids a full scan and a temp-btree sort.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_month ON timesheet(month_name, work_date)")
+
+# Ensure the schema once per process, not once per rerun: Streamlit re-executes
+# main() on every widget interaction, but the module is only imported once.
+create_table()
+
+def add_data(work_date, hours_worked):
+    """
+    Insert or update a record into the timesheet table.
+    If an entry exists for the same date, REPLACE it.
+    """
+    with _write_tx():
+        _execute(SQL_UPSERT, (_to_db_date(work_date), hours_worked))
+    # Invalidate cached reads so the new entry shows up immediately.
+    get_month_summary.clear()
+    get_timesheet_by_month.clear()
+    get_all_dates.clear()
+    get_hours_for_date.clear()
+
+def add_data_bulk(rows):
+    """
+    Insert or update many (work_date, hours_worked) records at once.
+    executemany with a single commit amortizes the transaction overhead
+    across the whole batch instead of paying it per row.
+    """
+    params = [(_to_db_date(d), hours) for d, hours in rows]
+    with _write_tx():
+        _executemany(SQL_UPSERT, params)
+    get_month_summary.clear()
+    get_timesheet_by_month.clear()
+    get_all_dates.clear()
+    get_hours_for_date.clear()
+
+@st.cache_data(ttl=300)
+def get_month_summary():
+    """
+    Retrieve (month_name, total_hours, entry_count) per month in
+    chronological order. One aggregate scan replaces the old DISTINCT
+    query and lets the month selector show totals without a second
+    round-trip.
+    """
+    return get_conn().execute(SQL_MONTH_SUMMARY).fetchall()
+
+@st.cache_data(ttl=300)
 def get_timesheet_by_month(month):
     """
-    Retrieve all rows that match the selected month, ordered by date.
+    Retrieve all rows that match the selected month as a DataFrame,
+    ordered by date. pd.read_sql_query hands sqlite's rows straight to
+    pandas instead of materializing an intermediate list of tuples.
     """
-    c.execute(
-        "SELECT work_date, hours_worked, month_name FROM timesheet WHERE month_name = ? ORDER BY work_date",
-        (month,)
-    )
-    data = c.fetchall()
-    return data
+    df = pd.read_sql_query(SQL_BY_MONTH, get_conn(), params=(month,))
+    # Vectorized conversion of the stored YYYYMMDD integers back to ISO.
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y%m%d").dt.strftime("%Y-%m-%d")
+    return df
 
+@st.cache_data(ttl=300)
 def get_all_dates():
     """
     Retrieve all distinct dates from the timesheet table, ordered by date.
     """
-    c.execute("SELECT DISTINCT work_date FROM timesheet ORDER BY work_date")
-    data = c.fetchall()
-    return [row[0] for row in data]
+    data = get_scalar_cursor().execute(SQL_ALL_DATES).fetchall()
+    return list(map(_from_db_date, data))
 
+@st.cache_data(ttl=300)
 def get_hours_for_date(date_str):
     """
     Retrieve hours_worked for a particular date.
     """
-    c.execute("SELECT hours_worked FROM timesheet WHERE work_date = ?", (date_str,))
-    row = c.fetchone()
+    row = get_conn().execute(SQL_HOURS_FOR_DATE, (_to_db_date(date_str),)).fetchone()
     return row[0] if row else 0.0
 
 def update_hours_for_date(date_str, new_hours):
     """
-    Update the hours_worked for a specific date.
+    Update the hours_worked for a specific date. month_name follows
+    automatically since it is generated from work_date.
     """
-    # Recompute the month name from the date (in case it changed, though unlikely).
-    month_name = datetime.strptime(date_str, "%Y-%m-%d").strftime("%B")
-    c.execute(
-        "UPDATE timesheet SET hours_worked = ?, month_name = ? WHERE work_date = ?",
-        (new_hours, month_name, date_str)
-    )
-    conn.commit()
+    with _write_tx():
+        _execute(SQL_UPDATE_HOURS, (new_hours, _to_db_date(date_str)))
+    # Invalidate cached reads so the edited entry shows up immediately.
+    # Editing hours never changes which dates exist, so the
+    # get_all_dates cache survives and the Edit Hours tab doesn't
+    # re-scan the table after every update. The month summary does
+    # change (its totals include the edited hours).
+    get_month_summary.clear()
+    get_timesheet_by_month.clear()
+    get_hours_for_date.clear()
+
+CSV_CHUNK_ROWS = 10_000
+CSV_SMALL_ROWS = 1_000
+
+def csv_buffer(df):
+    """
+    Serialize a DataFrame to CSV, returning a file-like buffer for
+    st.download_button. Typical months hold at most 31 rows, where
+    pandas' serializer is pure overhead — csv.writer over the raw tuples
+    is far fewer instructions. Large frames go through to_csv in row
+    chunks, keeping the serializer's working set at O(chunk) instead of
+    one giant intermediate string.
+    """
+    buf = io.StringIO()
+    if len(df) < CSV_SMALL_ROWS:
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(df.columns)
+        writer.writerows(df.itertuples(index=False, name=None))
+    else:
+        buf.write(",".join(df.columns) + "\n")
+        for start in range(0, len(df), CSV_CHUNK_ROWS):
+            df.iloc[start:start + CSV_CHUNK_ROWS].to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    return buf
+
+# ------------------------------------------------------------------------------
+# AUTH
+# ------------------------------------------------------------------------------
+
+# Hash the password once at import and keep only the digest around; login
+# attempts are compared digest-to-digest with hmac.compare_digest, which
+# doesn't early-exit like == and so leaks no timing information.
+_password_env = os.environ.get("TIMESHEET_PASSWORD")
+_PW_HASH = hashlib.sha256(_password_env.encode()).digest() if _password_env else None
+del _password_env
+
+def check_password(candidate):
+    """
+    Constant-time check of a login attempt against the stored digest.
+    """
+    return hmac.compare_digest(_PW_HASH, hashlib.sha256(candidate.encode()).digest())
 
 # ------------------------------------------------------------------------------
 # STREAMLIT APP
 # ------------------------------------------------------------------------------
 
+# Each menu section is a fragment: interacting with a widget inside one
+# reruns only that section, not the whole script, so a month change in the
+# view doesn't re-walk the login flow, sidebar, and unrelated queries.
+
+@st.fragment
+def view_timesheet():
+    st.subheader("Timesheet")
+
+    # Fetch per-month totals from the DB
+    summary = get_month_summary()
+
+    if len(summary) == 0:
+        st.info("No data available. Please log some hours first.")
+    else:
+        # Month selector, labelled with each month's totals
+        labels = {
+            month: f"{month} — {total:g} h over {count} entries"
+            for month, total, count in summary
+        }
+        selected_month = st.selectbox(
+            "Select a month",
+            list(labels),
+            format_func=labels.get
+        )
+
+        # Display data for the chosen month
+        if selected_month:
+            df = get_timesheet_by_month(selected_month)
+            if not df.empty:
+                st.dataframe(df)
+
+                # CSV download
+                st.download_button(
+                    label="Download Timesheet",
+                    data=csv_buffer(df),
+                    file_name=f"timesheet_{selected_month}.csv",
+                    mime="text/csv"
+                )
+            else:
+                st.info(f"No entries found for the month: {selected_month}")
+
+@st.fragment
+def log_hours():
+    st.subheader("Log Your Hours")
+
+    # Date input (defaults to today's date)
+    input_date = st.date_input("Select Date", datetime.now())
+    # Number input for hours worked
+    hours_worked = st.number_input("Enter Hours", min_value=0.0, format="%.2f")
+
+    # Show which month the entry will be filed under
+    st.caption(
+        f"This entry will be filed under "
+        f"**{month_name_of(input_date.year, input_date.month)}**."
+    )
+
+    # Button to log the data
+    if st.button("Log Hours"):
+        add_data(
+            work_date=input_date.strftime("%Y-%m-%d"),
+            hours_worked=hours_worked
+        )
+        st.success("Hours logged successfully!")
+
+    # Bulk import: accepts the same CSV layout the download produces.
+    st.markdown("---")
+    st.subheader("Log Multiple Days")
+    uploaded = st.file_uploader(
+        "Upload a CSV with 'Date' and 'Hours Worked' columns", type="csv"
+    )
+    if uploaded is not None and st.button("Import CSV"):
+        bulk_df = pd.read_csv(uploaded)
+        dates = pd.to_datetime(bulk_df["Date"])
+        rows = list(zip(
+            dates.dt.strftime("%Y-%m-%d"),
+            bulk_df["Hours Worked"].astype(float)
+        ))
+        add_data_bulk(rows)
+        st.success(f"Imported {len(rows)} entries!")
+
+@st.fragment
+def edit_hours():
+    # Double-check the user has permission (should always be True if we got here).
+    if not st.session_state["has_edit_access"]:
+        st.error("You do not have permission to edit hours.")
+        st.stop()
+
+    st.subheader("Edit Hours for a Date")
+
+    all_dates = get_all_dates()
+    if all_dates:
+        # Select the date you want to edit
+        selected_date = st.selectbox("Select a date to edit", all_dates)
+
+        if selected_date:
+            # Fetch current hours
+            current_hours = get_hours_for_date(selected_date)
+            st.write(f"Current hours for {selected_date}: **{current_hours}**")
+
+            # Input to update the hours
+            new_hours = st.number_input(
+                "Enter new hours",
+                min_value=0.0,
+                value=float(current_hours),
+                format="%.2f"
+            )
+
+            if st.button("Update Hours"):
+                update_hours_for_date(selected_date, new_hours)
+                st.success(f"Updated hours for {selected_date} to {new_hours}!")
+    else:
+        st.info("No data to edit yet. Please log some hours first.")
+
 def main():
     st.set_page_config(page_title="Raise Diversity Timesheet", layout="centered")
 
-    # -- STEP 1: Read the password from an environment variable
-    password_env = os.environ.get("TIMESHEET_PASSWORD")
-    if not password_env:
+    # -- STEP 1: Make sure a password was configured at startup
+    if _PW_HASH is None:
         st.error("No password found in environment variable 'TIMESHEET_PASSWORD'.")
         st.stop()
 
@@ -121,7 +472,7 @@ def main():
         if st.button("Login"):
             # Only valid username => 'raisediversity'
             # Only valid password => matches environment variable
-            if input_user == "raisediversity" and input_pass == password_env:
+            if input_user == "raisediversity" and check_password(input_pass):
                 st.session_state["logged_in"] = True
                 st.session_state["username"] = input_user
                 # For this specific user, grant edit access
@@ -135,9 +486,6 @@ def main():
     # -- STEP 4: If logged in, display the rest of the app
     st.title(f"Timesheet App – Logged in as {st.session_state['username']}")
 
-    # Create table if not exists
-    create_table()
-
     # Build menu
     menu_options = ["View Timesheet", "Log Hours"]
     # Only show Edit Hours if user has edit access
@@ -146,96 +494,12 @@ def main():
 
     choice = st.sidebar.selectbox("Menu", menu_options)
 
-    # ---------------
-    # VIEW TIMESHEET
-    # ---------------
     if choice == "View Timesheet":
-        st.subheader("Timesheet")
-
-        # Fetch existing months from the DB
-        months = get_months()
-
-        if len(months) == 0:
-            st.info("No data available. Please log some hours first.")
-        else:
-            # Month selector
-            selected_month = st.selectbox("Select a month", months)
-
-            # Display data for the chosen month
-            if selected_month:
-                data = get_timesheet_by_month(selected_month)
-                if data:
-                    df = pd.DataFrame(data, columns=["Date", "Hours Worked", "Month"])
-                    st.dataframe(df)
-
-                    # CSV download
-                    csv_data = df.to_csv(index=False)
-                    st.download_button(
-                        label="Download Timesheet",
-                        data=csv_data,
-                        file_name=f"timesheet_{selected_month}.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.info(f"No entries found for the month: {selected_month}")
-
-    # -----------
-    # LOG HOURS
-    # -----------
+        view_timesheet()
     elif choice == "Log Hours":
-        st.subheader("Log Your Hours")
-
-        # Date input (defaults to today's date)
-        input_date = st.date_input("Select Date", datetime.now())
-        # Number input for hours worked
-        hours_worked = st.number_input("Enter Hours", min_value=0.0, format="%.2f")
-
-        # Convert the selected date into a more readable month name
-        month_name = input_date.strftime("%B")
-
-        # Button to log the data
-        if st.button("Log Hours"):
-            add_data(
-                work_date=input_date.strftime("%Y-%m-%d"),
-                hours_worked=hours_worked,
-                month_name=month_name
-            )
-            st.success("Hours logged successfully!")
-
-    # -------------
-    # EDIT HOURS
-    # -------------
+        log_hours()
     elif choice == "Edit Hours":
-        # Double-check the user has permission (should always be True if we got here).
-        if not st.session_state["has_edit_access"]:
-            st.error("You do not have permission to edit hours.")
-            st.stop()
-
-        st.subheader("Edit Hours for a Date")
-
-        all_dates = get_all_dates()
-        if all_dates:
-            # Select the date you want to edit
-            selected_date = st.selectbox("Select a date to edit", all_dates)
-
-            if selected_date:
-                # Fetch current hours
-                current_hours = get_hours_for_date(selected_date)
-                st.write(f"Current hours for {selected_date}: **{current_hours}**")
-
-                # Input to update the hours
-                new_hours = st.number_input(
-                    "Enter new hours",
-                    min_value=0.0,
-                    value=float(current_hours),
-                    format="%.2f"
-                )
-
-                if st.button("Update Hours"):
-                    update_hours_for_date(selected_date, new_hours)
-                    st.success(f"Updated hours for {selected_date} to {new_hours}!")
-        else:
-            st.info("No data to edit yet. Please log some hours first.")
+        edit_hours()
 
 
 if __name__ == "__main__":